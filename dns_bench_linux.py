@@ -5,6 +5,8 @@ Industry-standard DNS benchmarking - automatically detects current DNS servers
 and benchmarks them against popular public DNS servers.
 """
 
+import asyncio
+import io
 import subprocess
 import time
 import statistics
@@ -12,8 +14,102 @@ import sys
 import argparse
 import re
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Tuple, Optional
+import secrets
+from array import array
+from ipaddress import ip_address
+from operator import attrgetter
+from typing import List, Dict, NamedTuple, Set, Tuple, Optional
+
+try:
+    import dns.entropy
+    import dns.exception
+    import dns.flags
+    import dns.message
+    import dns.rcode
+except ImportError:
+    print("Error: dnspython is required but not installed!")
+    print("Please install python3-dnspython (Ubuntu/Debian) or run 'pip install dnspython'")
+    sys.exit(1)
+
+QUERY_TIMEOUT = 2.0  # seconds to wait for a single DNS response
+EDNS_PAYLOAD = 4096  # advertised EDNS0 UDP payload size in bytes
+
+# "DNS Servers:" / "Current DNS Server:" entries in systemd-resolve/resolvectl
+# output (not "Fallback DNS Servers:"), including servers listed on the
+# indented lines that follow, up to the next "Key: value" line
+_DNS_SERVERS_RE = re.compile(
+    r'(?<!Fallback )DNS Servers?:(.*(?:\n[ \t]+(?![^\n]*:(?:[ \t]|$))[^\n]*)*)', re.MULTILINE)
+# IPv4 or IPv6 (optionally %scoped) literals; '#' SNI suffixes as in
+# 1.1.1.1#cloudflare-dns.com are left out
+_IP_RE = re.compile(
+    r'(?<![\w:.])(?:\d{1,3}(?:\.\d{1,3}){3}|[0-9a-fA-F]*:[0-9a-fA-F:.]+(?:%[\w.-]+)?)(?![\w:.%])')
+
+class ServerResult(NamedTuple):
+    """Benchmark outcome for one DNS server; times are in milliseconds"""
+    name: str
+    server: str
+    success_rate: float
+    successful_queries: int
+    failed_queries: int
+    truncated_queries: int
+    avg_time: float
+    min_time: float
+    max_time: float
+    median_time: float
+    uncached_avg_time: float
+    uncached_median_time: float
+
+class _DNSProtocol(asyncio.DatagramProtocol):
+    """Collects raw UDP replies from one DNS server, keyed by query ID"""
+
+    def __init__(self):
+        self.transport: Optional[asyncio.DatagramTransport] = None
+        self.pending: Set[int] = set()  # IDs of queries still awaiting a reply
+        self.replies: Dict[int, Tuple[bytes, int]] = {}  # ID -> (wire reply, receive time in ns)
+        self.error: Optional[Exception] = None
+        self._idle: Optional[asyncio.Future] = None
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self.transport = transport
+
+    def send(self, query_id: int, wire: bytes) -> int:
+        """Send a wire-format query; returns its send time in ns"""
+        self.pending.add(query_id)
+        sent = time.perf_counter_ns()
+        self.transport.sendto(wire)
+        return sent
+
+    async def wait(self, timeout: float):
+        """Wait until every sent query has been answered, or timeout elapses"""
+        if not self.pending:
+            return
+        self._idle = asyncio.get_running_loop().create_future()
+        await asyncio.wait([self._idle], timeout=timeout)
+        self._idle = None
+
+    def datagram_received(self, data: bytes, addr):
+        # Only timestamp and stash the reply here. Parsing it now would be
+        # charged to every reply still queued behind it in the socket buffer.
+        received = time.perf_counter_ns()
+        if len(data) < 12:  # shorter than a DNS header
+            return
+        query_id = int.from_bytes(data[:2], 'big')
+
+        # Late replies to abandoned queries are no longer pending
+        if query_id in self.pending:
+            self.pending.discard(query_id)
+            self.replies[query_id] = (data, received)
+            self._wake_if_idle()
+
+    def error_received(self, exc: Exception):
+        # e.g. ICMP port unreachable - nothing else will answer
+        self.error = exc
+        self.pending.clear()
+        self._wake_if_idle()
+
+    def _wake_if_idle(self):
+        if not self.pending and self._idle is not None and not self._idle.done():
+            self._idle.set_result(None)
 
 class DNSBenchmark:
     def __init__(self, verbose=False):
@@ -27,6 +123,12 @@ class DNSBenchmark:
             'spotify.com', 'zoom.us', 'adobe.com', 'oracle.com'
         ]
 
+        # Popular domains are always hot in public resolver caches, so each
+        # probe also sends a random name under every fourth of them that no
+        # resolver can have cached - these measure a full recursive lookup
+        # (normally answered with NXDOMAIN)
+        self.uncached_zones = self.test_domains[3::4]
+
         self.public_dns_servers = {
             'Cloudflare': '1.1.1.1',
             'Cloudflare-2': '1.0.0.1',
@@ -46,25 +148,36 @@ class DNSBenchmark:
             'Quad9': '9.9.9.9'
         }
 
+        # System DNS servers don't change during a run; detected once
+        self._dns_cache: Optional[List[str]] = None
+
+        # Wire-format queries are the same for every server; see _build_wire_queries
+        self._warmup_query: Optional[Tuple[int, bytes]] = None
+        self._wire_queries: Optional[List[Tuple[str, int, bytes]]] = None
+        self._shared_ids: frozenset = frozenset()
+
     def validate_ip_address(self, ip: str) -> bool:
         """Validate IPv4 and IPv6 addresses"""
-        # IPv4 pattern
-        ipv4_pattern = r'^(\d{1,3}\.){3}\d{1,3}$'
-        # Basic IPv6 pattern (simplified)
-        ipv6_pattern = r'^([0-9a-fA-F]{0,4}:){2,7}[0-9a-fA-F]{0,4}$'
-
-        if re.match(ipv4_pattern, ip):
-            # Additional IPv4 validation
-            parts = ip.split('.')
-            return all(0 <= int(part) <= 255 for part in parts)
-        elif re.match(ipv6_pattern, ip):
+        try:
+            ip_address(ip)
             return True
-        return False
+        except ValueError:
+            return False
+
+    def _is_remote_server(self, ip: str) -> bool:
+        """Valid address that isn't a loopback stub resolver (127.0.0.0/8, ::1)"""
+        try:
+            return not ip_address(ip).is_loopback
+        except ValueError:
+            return False
 
     def get_current_dns_servers(self) -> List[str]:
         """Get current DNS servers from system configuration"""
-        dns_servers = []
-        seen_servers = set()  # Track unique servers
+        if self._dns_cache is not None:
+            return self._dns_cache
+
+        # Keys are the unique servers, in discovery order
+        candidates: Dict[str, None] = {}
 
         # Method 1: /etc/resolv.conf
         try:
@@ -74,45 +187,27 @@ class DNSBenchmark:
                         parts = line.strip().split()
                         if len(parts) >= 2:
                             server = parts[1]
-                            if self.validate_ip_address(server) and not server.startswith('127.'):
-                                if server not in seen_servers:
-                                    dns_servers.append(server)
-                                    seen_servers.add(server)
+                            if self._is_remote_server(server):
+                                candidates[server] = None
         except Exception as e:
             if self.verbose:
                 print(f"Could not read /etc/resolv.conf: {e}")
 
+        # Only fall back to the slower tools when resolv.conf points at a
+        # local stub resolver (e.g. systemd-resolved on 127.0.0.53)
+        if candidates:
+            self._dns_cache = list(candidates)
+            return self._dns_cache
+
         # Method 2: systemd-resolve/resolvectl
         for cmd in ['systemd-resolve --status', 'resolvectl status']:
             try:
                 result = subprocess.run(cmd.split(), capture_output=True, text=True, timeout=5)
                 if result.returncode == 0:
-                    lines = result.stdout.split('\n')
-                    for i, line in enumerate(lines):
-                        if 'DNS Servers:' in line or 'DNS Server:' in line:
-                            # Extract from current line if present
-                            if ':' in line:
-                                server_part = line.split(':', 1)[1].strip()
-                                # Handle multiple servers on same line
-                                for server in server_part.split():
-                                    if self.validate_ip_address(server) and not server.startswith('127.'):
-                                        if server not in seen_servers:
-                                            dns_servers.append(server)
-                                            seen_servers.add(server)
-
-                            # Check following lines for additional servers
-                            for j in range(i + 1, min(i + 10, len(lines))):
-                                next_line = lines[j].strip()
-                                if next_line and not any(x in next_line for x in [':', '=', 'Domain']):
-                                    # This might be a DNS server
-                                    for server in next_line.split():
-                                        if self.validate_ip_address(server) and not server.startswith('127.'):
-                                            if server not in seen_servers:
-                                                dns_servers.append(server)
-                                                seen_servers.add(server)
-                                elif any(x in next_line for x in [':', '=']):
-                                    # We've hit another section
-                                    break
+                    for servers in _DNS_SERVERS_RE.findall(result.stdout):
+                        for server in _IP_RE.findall(servers):
+                            if self._is_remote_server(server):
+                                candidates[server] = None
             except Exception as e:
                 if self.verbose:
                     print(f"Could not run {cmd}: {e}")
@@ -125,88 +220,150 @@ class DNSBenchmark:
                     if 'IP4.DNS' in line or 'IP6.DNS' in line:
                         if ':' in line:
                             server = line.split(':', 1)[1].strip()
-                            if self.validate_ip_address(server) and not server.startswith('127.'):
-                                if server not in seen_servers:
-                                    dns_servers.append(server)
-                                    seen_servers.add(server)
+                            if self._is_remote_server(server):
+                                candidates[server] = None
         except Exception as e:
             if self.verbose:
                 print(f"Could not run nmcli: {e}")
 
-        return dns_servers
-
-    def query_dns(self, domain: str, dns_server: str) -> Tuple[bool, float]:
-        """Query DNS server and return success status and response time"""
-        try:
-            start_time = time.time()
-
-            # Use dig if available, otherwise fallback to nslookup
-            if self.dig_available:
-                result = subprocess.run([
-                    'dig', '+short', '+time=2', '+tries=1', f'@{dns_server}', domain
-                ], capture_output=True, text=True, timeout=3)
-            else:
-                result = subprocess.run([
-                    'nslookup', '-timeout=2', domain, dns_server
-                ], capture_output=True, text=True, timeout=3)
-
-            end_time = time.time()
-            response_time = (end_time - start_time) * 1000
-
-            if result.returncode == 0:
-                if self.dig_available:
-                    success = bool(result.stdout.strip())
-                else:
-                    success = 'NXDOMAIN' not in result.stdout and 'can\'t find' not in result.stdout and result.stdout.strip()
-                return success, response_time if success else float('inf')
-
-            return False, float('inf')
-
-        except subprocess.TimeoutExpired:
-            return False, float('inf')
-        except Exception as e:
-            if self.verbose:
-                print(f"Error querying {domain} on {dns_server}: {e}")
-            return False, float('inf')
-
-    def benchmark_server(self, dns_server: str, name: str = None) -> Dict:
+        self._dns_cache = list(candidates)
+        return self._dns_cache
+
+    @staticmethod
+    def _make_wire_query(domain: str, used_ids: Set[int], recursion: bool = True) -> Tuple[int, bytes]:
+        """Serialize an A query under an ID not in used_ids (which it joins)"""
+        # EDNS0 with a large UDP payload so answers fit in one datagram
+        # instead of coming back truncated
+        query = dns.message.make_query(domain, 'A', use_edns=0, payload=EDNS_PAYLOAD)
+        if not recursion:
+            query.flags &= ~dns.flags.RD
+        while query.id in used_ids:
+            query.id = dns.entropy.random_16()
+        used_ids.add(query.id)
+        return query.id, query.to_wire()
+
+    def _build_wire_queries(self):
+        """Serialize the warm-up and test_domains queries once, under distinct IDs,
+        so every server is sent the same packets"""
+        used_ids = set()
+        # The warm-up only primes the network path, so it doesn't ask the
+        # resolver to recurse (and warm its cache) on our behalf
+        self._warmup_query = self._make_wire_query('google.com', used_ids, recursion=False)
+        self._wire_queries = [(domain, *self._make_wire_query(domain, used_ids))
+                              for domain in self.test_domains]
+        self._shared_ids = frozenset(used_ids)
+
+    @staticmethod
+    def _is_answered(response: dns.message.Message, uncached: bool = False) -> bool:
+        """Same criterion as 'dig +short': a NOERROR reply with at least one answer.
+        Random uncached names only need a definitive NOERROR/NXDOMAIN reply."""
+        if uncached:
+            return response.rcode() in (dns.rcode.NOERROR, dns.rcode.NXDOMAIN)
+        return response.rcode() == dns.rcode.NOERROR and bool(response.answer)
+
+    async def benchmark_server(self, dns_server: str, name: str = None) -> ServerResult:
         """Benchmark a single DNS server"""
         if name is None:
             name = dns_server
+        if self._wire_queries is None:
+            self._build_wire_queries()
+
+        # Uncached names are fresh for every server: resolvers sharing a cache
+        # (1.1.1.1/1.0.0.1, 8.8.8.8/8.8.4.4, a router forwarding to either)
+        # would otherwise answer whichever asks second from that cache
+        used_ids = set(self._shared_ids)
+        uncached_domains = set()
+        wire_queries = []
+        for entry in self._wire_queries:
+            wire_queries.append(entry)
+            if entry[0] in self.uncached_zones:
+                uncached = f"{secrets.token_hex(6)}.{entry[0]}"
+                uncached_domains.add(uncached)
+                wire_queries.append((uncached, *self._make_wire_query(uncached, used_ids)))
+        total_queries = len(wire_queries)
+
+        # Buffer verbose output so concurrent probes don't interleave
+        log = [f"\nTesting {name} ({dns_server})..."]
+        # Latencies (ms) as packed C doubles rather than lists of float objects
+        successful_queries = array('d')
+        uncached_queries = array('d')
+        truncated_queries = 0
+
+        # One connected UDP socket carries every query to this server
+        loop = asyncio.get_running_loop()
+        try:
+            transport, protocol = await loop.create_datagram_endpoint(
+                _DNSProtocol, remote_addr=(dns_server, 53))
+        except OSError as e:
+            # e.g. EACCES (broadcast), EINVAL, ENETUNREACH - nothing can be
+            # sent, so report the server with every query failed
+            log.append(f"  {dns_server}: {e}")
+            if self.verbose:
+                print("\n".join(log))
+            inf = float('inf')
+            return ServerResult(
+                name=name, server=dns_server, success_rate=0.0,
+                successful_queries=0, failed_queries=total_queries,
+                truncated_queries=0, avg_time=inf, min_time=inf, max_time=inf,
+                median_time=inf, uncached_avg_time=inf, uncached_median_time=inf)
+        try:
+            # Untimed warm-up so ARP, route lookup and a cold resolver don't
+            # skew the first measured query. Its ID differs from every timed
+            # query, so dropping it can't misattribute a late reply.
+            warmup_id, warmup_wire = self._warmup_query
+            protocol.send(warmup_id, warmup_wire)
+            await protocol.wait(QUERY_TIMEOUT)
+            protocol.pending.discard(warmup_id)
+
+            # Send every query up front so the whole probe costs ~1 RTT
+            queries = [(domain, query_id, protocol.send(query_id, wire))
+                       for domain, query_id, wire in wire_queries]
+            await protocol.wait(QUERY_TIMEOUT)
+        finally:
+            transport.close()
+
+        if protocol.error is not None:
+            log.append(f"  {dns_server}: {protocol.error}")
+
+        for domain, query_id, sent in queries:
+            # Anything still unanswered timed out
+            reply = protocol.replies.get(query_id)
+            if reply is None:
+                log.append(f"  {domain}: FAILED")
+                continue
+            data, received = reply
+            try:
+                response = dns.message.from_wire(data)
+            except dns.exception.DNSException:
+                log.append(f"  {domain}: FAILED (malformed reply)")
+                continue
+            uncached = domain in uncached_domains
+            if response.flags & dns.flags.TC:
+                # A real client would retry over TCP, which this UDP-only
+                # timing doesn't include - keep it out of the latency stats
+                truncated_queries += 1
+                log.append(f"  {domain}: TRUNCATED")
+            elif self._is_answered(response, uncached):
+                response_time = (received - sent) / 1e6
+                if uncached:
+                    uncached_queries.append(response_time)
+                    log.append(f"  {domain}: {response_time:.1f}ms (uncached)")
+                else:
+                    successful_queries.append(response_time)
+                    log.append(f"  {domain}: {response_time:.1f}ms")
+            else:
+                log.append(f"  {domain}: FAILED")
 
         if self.verbose:
-            print(f"\nTesting {name} ({dns_server})...")
+            print("\n".join(log))
+        succeeded = len(successful_queries) + len(uncached_queries)
+        failed_queries = total_queries - succeeded - truncated_queries
 
-        successful_queries = []
-        failed_queries = 0
-
-        # Use limited concurrency to avoid overwhelming the DNS server
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            future_to_domain = {
-                executor.submit(self.query_dns, domain, dns_server): domain
-                for domain in self.test_domains
-            }
-
-            for future in as_completed(future_to_domain):
-                domain = future_to_domain[future]
-                try:
-                    success, response_time = future.result()
-                    if success and response_time != float('inf'):
-                        successful_queries.append(response_time)
-                        if self.verbose:
-                            print(f"  {domain}: {response_time:.1f}ms")
-                    else:
-                        failed_queries += 1
-                        if self.verbose:
-                            print(f"  {domain}: FAILED")
-                except Exception:
-                    failed_queries += 1
-
-        # Calculate statistics
-        total_queries = len(self.test_domains)
+        # Calculate statistics - the headline numbers cover cached domains
+        # only, so rankings stay comparable with earlier runs
         if successful_queries:
             stats = {
-                'avg_time': statistics.mean(successful_queries),
+                'avg_time': statistics.fmean(successful_queries),
                 'min_time': min(successful_queries),
                 'max_time': max(successful_queries),
                 'median_time': statistics.median(successful_queries),
@@ -219,25 +376,26 @@ class DNSBenchmark:
                 'median_time': float('inf'),
             }
 
-        return {
-            'name': name,
-            'server': dns_server,
-            'success_rate': (len(successful_queries) / total_queries) * 100,
-            'successful_queries': len(successful_queries),
-            'failed_queries': failed_queries,
+        if uncached_queries:
+            stats['uncached_avg_time'] = statistics.fmean(uncached_queries)
+            stats['uncached_median_time'] = statistics.median(uncached_queries)
+        else:
+            stats['uncached_avg_time'] = float('inf')
+            stats['uncached_median_time'] = float('inf')
+
+        return ServerResult(
+            name=name,
+            server=dns_server,
+            success_rate=(succeeded / total_queries) * 100,
+            successful_queries=succeeded,
+            failed_queries=failed_queries,
+            truncated_queries=truncated_queries,
             **stats
-        }
+        )
 
     def run_benchmark(self, test_current=True, test_public=True, custom_servers=None, top3_only=False):
         """Run the complete benchmark"""
-        # Check available tools
-        self.dig_available = self.check_command('dig')
-        nslookup_available = self.check_command('nslookup')
-
-        if not self.dig_available and not nslookup_available:
-            print("Error: Neither 'dig' nor 'nslookup' command found!")
-            print("Please install dnsutils (Ubuntu/Debian) or bind-utils (CentOS/RHEL)")
-            return []
+        self._build_wire_queries()
 
         print("=== DNS Benchmark Tool ===")
         if not self.verbose:
@@ -278,93 +436,130 @@ class DNSBenchmark:
             print("No DNS servers to test!")
             return []
 
-        print(f"\nTesting {len(servers_to_test)} DNS servers with {len(self.test_domains)} domains...")
+        # The same address can be listed more than once (e.g. the current DNS
+        # is 1.1.1.1 and Cloudflare is tested too) - probe it once and share
+        # the result between every name that refers to it
+        names_by_server: Dict[str, List[str]] = {}
+        unique_servers = []
+        for name, server in servers_to_test:
+            names = names_by_server.setdefault(str(ip_address(server)), [])
+            if not names:
+                unique_servers.append((name, server))
+            names.append(name)
+
+        # Report what is actually probed: one entry (and progress dot) per address
+        domain_count = len(self.test_domains) + len(self.uncached_zones)
+        print(f"\nTesting {len(unique_servers)} DNS servers with {domain_count} domains "
+              f"({len(self.uncached_zones)} uncached)...")
+        duplicates = len(servers_to_test) - len(unique_servers)
+        if duplicates:
+            print(f"({duplicates} duplicate {'address' if duplicates == 1 else 'addresses'} "
+                  f"will reuse the result of the same server)")
         if not self.verbose:
             print("Progress: ", end="", flush=True)
 
-        # Run benchmarks
+        # Run benchmarks - every server is probed concurrently. On Linux
+        # asyncio.run drives an epoll-backed SelectorEventLoop: each server's
+        # socket is registered once and one epoll_wait serves every probe.
+        completed = {}
+        try:
+            asyncio.run(self._benchmark_servers(unique_servers, completed))
+        except KeyboardInterrupt:
+            print("\nBenchmark interrupted!")
+
+        if not self.verbose:
+            print(" Done!")
+
         results = []
-        for i, (name, server) in enumerate(servers_to_test):
-            if not self.verbose:
-                print(".", end="", flush=True)
+        for i in sorted(completed):
+            result = completed[i]
+            for name in names_by_server[str(ip_address(result.server))]:
+                results.append(result._replace(name=name))
+        return results
 
+    async def _benchmark_servers(self, servers_to_test: List[Tuple[str, str]], completed: Dict[int, ServerResult]):
+        """Probe all servers at once, storing each result under its index in servers_to_test"""
+        async def probe(i: int, name: str, server: str):
             try:
-                result = self.benchmark_server(server, name)
-                results.append(result)
-            except KeyboardInterrupt:
-                print("\nBenchmark interrupted!")
-                break
+                completed[i] = await self.benchmark_server(server, name)
             except Exception as e:
                 if self.verbose:
                     print(f"Failed to test {name}: {e}")
+            if not self.verbose:
+                print(".", end="", flush=True)
 
-        if not self.verbose:
-            print(" Done!")
-
-        return results
+        await asyncio.gather(*(probe(i, name, server)
+                               for i, (name, server) in enumerate(servers_to_test)))
 
-    def print_results(self, results: List[Dict], json_output: bool = False):
+    def print_results(self, results: List[ServerResult], json_output: bool = False):
         """Print formatted results"""
         if not results:
             return
 
         if json_output:
-            print(json.dumps(results, indent=2))
+            print(json.dumps([r._asdict() for r in results], indent=2))
             return
 
         # Sort by average response time
-        valid_results = [r for r in results if r['avg_time'] != float('inf')]
-        failed_results = [r for r in results if r['avg_time'] == float('inf')]
+        valid_results = [r for r in results if r.avg_time != float('inf')]
+        failed_results = [r for r in results if r.avg_time == float('inf')]
 
-        valid_results.sort(key=lambda x: x['avg_time'])
+        valid_results.sort(key=attrgetter('avg_time'))
 
-        print(f"\n{'='*80}")
-        print("DNS BENCHMARK RESULTS")
-        print(f"{'='*80}")
+        buf = io.StringIO()
+        buf.write(f"\n{'='*90}\n")
+        buf.write("DNS BENCHMARK RESULTS\n")
+        buf.write(f"{'='*90}\n")
 
         if valid_results:
-            print(f"{'#':<3} {'DNS Server':<25} {'Success':<10} {'Avg':<10} {'Min':<10} {'Max':<10} {'Median':<10}")
-            print("-" * 80)
+            buf.write(f"{'#':<3} {'DNS Server':<25} {'Success':<10} {'Avg':<10} {'Min':<10} {'Max':<10} {'Median':<10} {'Uncached':<10}\n")
+            buf.write("-" * 90 + "\n")
 
             for i, r in enumerate(valid_results, 1):
-                print(f"{i:<3} {r['name'][:24]:<25} "
-                      f"{r['success_rate']:.1f}%{'':<5} "
-                      f"{r['avg_time']:.1f}ms{'':<4} "
-                      f"{r['min_time']:.1f}ms{'':<4} "
-                      f"{r['max_time']:.1f}ms{'':<4} "
-                      f"{r['median_time']:.1f}ms")
+                uncached = r.uncached_avg_time
+                uncached = f"{uncached:.1f}ms" if uncached != float('inf') else "-"
+                buf.write(f"{i:<3} {r.name[:24]:<25} "
+                          f"{r.success_rate:.1f}%{'':<5} "
+                          f"{r.avg_time:.1f}ms{'':<4} "
+                          f"{r.min_time:.1f}ms{'':<4} "
+                          f"{r.max_time:.1f}ms{'':<4} "
+                          f"{r.median_time:.1f}ms{'':<4} "
+                          f"{uncached}\n")
+            buf.write("(Avg/Min/Max/Median: popular, cached domains; Uncached: average full recursive lookup)\n")
 
         if failed_results:
-            print(f"\nFailed DNS servers:")
+            buf.write(f"\nFailed DNS servers:\n")
             for r in failed_results:
-                print(f"  ✗ {r['name']} - {r['failed_queries']}/{r['failed_queries'] + r['successful_queries']} queries failed")
+                total = r.failed_queries + r.successful_queries + r.truncated_queries
+                buf.write(f"  ✗ {r.name} - {r.failed_queries}/{total} queries failed\n")
+
+        truncated_results = [r for r in results if r.truncated_queries]
+        if truncated_results:
+            buf.write(f"\nTruncated replies (would need a TCP retry, not included in timings):\n")
+            for r in truncated_results:
+                buf.write(f"  ! {r.name} - {r.truncated_queries} truncated\n")
 
         # Recommendations
         if valid_results:
             best = valid_results[0]
-            print(f"\n🏆 Best performing DNS server:")
-            print(f"   {best['name']} ({best['server']})")
-            print(f"   Average: {best['avg_time']:.1f}ms, Success: {best['success_rate']:.1f}%")
+            buf.write(f"\n🏆 Best performing DNS server:\n")
+            buf.write(f"   {best.name} ({best.server})\n")
+            buf.write(f"   Average: {best.avg_time:.1f}ms, Success: {best.success_rate:.1f}%\n")
 
             # Compare with current DNS
-            current_results = [r for r in valid_results if r['name'].startswith('Current-')]
+            current_results = [r for r in valid_results if r.name.startswith('Current-')]
             if current_results and len(valid_results) > 1:
                 current_best = current_results[0]
                 current_rank = next(i for i, r in enumerate(valid_results, 1) if r == current_best)
                 if current_rank > 1:
-                    improvement = ((current_best['avg_time'] - best['avg_time']) / current_best['avg_time']) * 100
-                    print(f"\n💡 Your current DNS ranks #{current_rank}")
-                    print(f"   Switching to {best['name']} could improve speed by {improvement:.1f}%")
+                    improvement = ((current_best.avg_time - best.avg_time) / current_best.avg_time) * 100
+                    buf.write(f"\n💡 Your current DNS ranks #{current_rank}\n")
+                    buf.write(f"   Switching to {best.name} could improve speed by {improvement:.1f}%\n")
                 else:
-                    print(f"\n✅ Your current DNS is already the fastest!")
+                    buf.write(f"\n✅ Your current DNS is already the fastest!\n")
 
-    def check_command(self, command: str) -> bool:
-        """Check if a command is available"""
-        try:
-            subprocess.run(['which', command], capture_output=True, check=True)
-            return True
-        except:
-            return False
+        # Emit the whole report with a single write instead of one print() per line
+        sys.stdout.write(buf.getvalue())
 
 def main():
     parser = argparse.ArgumentParser(
@@ -51,6 +51,36 @@ else
     exit 1
 fi
 
+# Make sure dependencies are installed
+echo "Checking dependencies..."
+if ! python3 -c 'import dns.message' >/dev/null 2>&1; then
+    if command -v apt-get >/dev/null 2>&1; then
+        $SUDO apt-get install -y python3-dnspython || true
+    elif command -v dnf >/dev/null 2>&1; then
+        $SUDO dnf install -y python3-dns || true
+    elif command -v yum >/dev/null 2>&1; then
+        $SUDO yum install -y python3-dns || true
+    elif command -v pacman >/dev/null 2>&1; then
+        $SUDO pacman -S --noconfirm python-dnspython || true
+    fi
+fi
+
+# dnspython is required by the benchmark; fall back to pip when no distro
+# package is available
+if ! python3 -c 'import dns.message' >/dev/null 2>&1; then
+    echo "Installing dnspython with pip..."
+    $SUDO python3 -m pip install dnspython || \
+        $SUDO python3 -m pip install --break-system-packages dnspython || true
+fi
+
+if python3 -c 'import dns.message' >/dev/null 2>&1; then
+    echo "✓ dnspython is installed"
+else
+    echo "❌ Error: dnspython could not be installed!"
+    echo "Please install python3-dnspython (Ubuntu/Debian) or run 'pip install dnspython'"
+    exit 1
+fi
+
 # Install the updated version
 echo "Installing updated version..."
 $SUDO cp "$LATEST_VERSION" "$INSTALL_DIR/$SCRIPT_NAME"